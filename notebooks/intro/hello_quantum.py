@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 
-import copy
+from collections import OrderedDict
 from io import BytesIO
 
-from qiskit import BasicAer as Aer
 from qiskit import ClassicalRegister, QuantumRegister, QuantumCircuit
-from qiskit import execute
+from qiskit import transpile
 from qiskit.visualization import plot_bloch_multivector
 from qiskit.quantum_info import Statevector
 
@@ -41,6 +40,33 @@ box_color = [light_purple,darker_purple]
 point_color = [dark_gray,dark_gray]
 
 
+# For each observable, sum its +/-1 values weighted by the counts for every outcome in every basis.
+def _sum_counts(counts, parity, shots):
+    values = np.zeros(parity.shape[0])
+    for m in range(parity.shape[0]):
+        for b in range(parity.shape[1]):
+            for k in range(parity.shape[2]):
+                values[m] += parity[m,b,k]*counts[b,k]
+    return values/shots
+
+def _tensordot_counts(counts, parity, shots):
+    return np.tensordot(parity, counts, axes=2)/shots
+
+# The function used for this is only chosen when results are first sampled, so that numba is not imported
+# (or compiled) unless a backend is used. It is the compiled loop if numba is installed, and tensordot otherwise.
+_reduce_counts = None
+
+def _get_reduce_counts():
+    global _reduce_counts
+    if _reduce_counts is None:
+        try:
+            import numba
+            _reduce_counts = numba.njit(_sum_counts)
+        except ImportError:
+            _reduce_counts = _tensordot_counts
+    return _reduce_counts
+
+
 class run_game():
     # Implements a puzzle, which is defined by the given inputs.
 
@@ -64,10 +90,10 @@ class run_game():
             The two qubits are always called '0' and '1' from the programming side. But for the player, we can display different names.
         eps=0.1
             How close the expectation values need to be to the targets for success to be declared.
-        backend=Aer.get_backend('qasm_simulator')
-            Backend to be used by Qiskit to calculate expectation values (defaults to local simulator).
+        backend=None
+            Backend to be used by Qiskit to calculate expectation values. By default, no backend is used, and they are instead calculated exactly from the statevector.
         shots=1024
-            Number of shots used to to calculate expectation values.
+            Number of shots used to to calculate expectation values (only used if a backend is given).
         mode='circle'
             Either the standard 'Hello Quantum' visualization can be used (with mode='circle'), or the extended one (mode='y') or the alternative line based one (mode='line').
         y_boxes = False
@@ -77,6 +103,10 @@ class run_game():
 
         def get_total_gate_list():
             # Get a text block describing allowed gates.
+            # This only changes when a required gate is used, so the last result is kept until then.
+
+            if self._gate_list_cache is not None:
+                return self._gate_list_cache
 
             total_gate_list = ""
             for qubit in allowed_gates:
@@ -96,6 +126,7 @@ class run_game():
                     else :
                         gate_list = "\nAllowed operations for " + qubit_names[qubit] + ":\n" + " "*10 + gate_list
                     total_gate_list += gate_list +"\n"
+            self._gate_list_cache = total_gate_list
             return total_gate_list
 
         def get_success(required_gates):
@@ -116,51 +147,61 @@ class run_game():
             gates = get_total_gate_list
 
         def get_command(gate,qubit):
-            # For a given gate and qubit, return the string describing the corresponding Qiskit string.
+            # For a given gate and qubit, return a function that applies it to a circuit (given the circuit and its register), the string describing the corresponding Qiskit command, and the key for its matrix in grid._gate_mats.
 
             if qubit=='both':
                 qubit = '1'
             qubit_name = qubit_names[qubit]
-            for name in qubit_names.values():
-                if name!=qubit_name:
-                    other_name = name
+            other_name = self._other[qubit]
+            target = int(qubit)
             # then make the command (both for the grid, and for printing to screen)
             if gate in ['x','y','z','h']:
-                real_command = f'grid.qc.{gate}(grid.qr[{qubit}])'
+                apply_gate = lambda qc, qr: getattr(qc,gate)(qr[target])
                 clean_command = f'qc.{gate}({qubit_name})'
+                mat_key = f'{gate}{target}'
             elif gate in ['ry(pi/4)','ry(-pi/4)']:
-                real_command  = 'grid.qc.ry('+'-'*(gate=='ry(-pi/4)')+'np.pi/4,grid.qr['+qubit+'])'
+                theta = -np.pi/4 if gate=='ry(-pi/4)' else np.pi/4
+                apply_gate = lambda qc, qr: qc.ry(theta,qr[target])
                 clean_command = 'qc.ry('+'-'*(gate=='ry(-pi/4)')+'np.pi/4,'+qubit_name+')'
+                mat_key = f'{gate}{target}'
             elif gate in ['rx(pi/4)','rx(-pi/4)']:
-                real_command  = 'grid.qc.rx('+'-'*(gate=='rx(-pi/4)')+'np.pi/4,grid.qr['+qubit+'])'
+                theta = -np.pi/4 if gate=='rx(-pi/4)' else np.pi/4
+                apply_gate = lambda qc, qr: qc.rx(theta,qr[target])
                 clean_command = 'qc.rx('+'-'*(gate=='rx(-pi/4)')+'np.pi/4,'+qubit_name+')'
+                mat_key = f'{gate}{target}'
             elif gate in ['cz','cx','swap']:
-                real_command = (
-                    f'grid.qc.{gate}(grid.qr['
-                    + '0' * (qubit == '1')
-                    + '1' * (qubit == '0')
-                    + '],grid.qr['
-                    + qubit
-                    + '])'
-                )
+                control = int(self._other_index[qubit])
+                apply_gate = lambda qc, qr: getattr(qc,gate)(qr[control],qr[target])
                 clean_command = f'qc.{gate}' + '(' + other_name + ',' + qubit_name + ')'
-            return [real_command,clean_command]
+                mat_key = f'{gate}{control}{target}'
+            return [apply_gate,clean_command,mat_key]
 
         bloch = [None]
 
+        # for each qubit, the other one and its name
+        self._other_index = {'0': '1', '1': '0'}
+        self._other = {'0': qubit_names['1'], '1': qubit_names['0']}
+        # the qubit (or 'both') corresponding to each option the player can choose
+        self._q01_map = {qubit_names['0']: '0', qubit_names['1']: '1', 'not required': 'both'}
+
         # set up initial state and figure
         if mode=='y':
             grid = pauli_grid(backend=backend,shots=shots,mode='line',y_boxes=True)
         else:
             grid = pauli_grid(backend=backend,shots=shots,mode=mode)
 
+        # the gates are stored as functions (to apply them) and as strings (to show them)
+        self._initializer = []
         self.initializer = []
         for gate in initialize:
             command = get_command(gate[0],gate[1])
-            eval(command[0])
+            command[0](grid.qc,grid.qr)
+            grid._evolve(command[2])
+            self._initializer.append(command[0])
             self.initializer.append(command[1])
 
-        required_gates = copy.deepcopy(allowed_gates)
+        required_gates = {q: dict(gates) for q, gates in allowed_gates.items()}
+        self._gate_list_cache = None
 
         # determine which qubits to show in figure
         if allowed_gates['0']=={} : # if no gates are allowed for qubit 0, we know to only show qubit 1
@@ -201,7 +242,9 @@ class run_game():
 
         boxes = widgets.VBox([gate,qubit,action])
         display(boxes)
+        self._program = []
         self.program = []
+        self._bloch_cache = None
         self.qubit_names = qubit_names
 
         def given_gate(a):
@@ -245,15 +288,18 @@ class run_game():
                     else:
                         q_gate = gate.value
                     q = qubit_names['1'] if qubit.value=="not required" else qubit.value
-                    q01 = '0'*(qubit.value==qubit_names['0']) + '1'*(qubit.value==qubit_names['1']) + 'both'*(qubit.value=="not required")
+                    q01 = self._q01_map[qubit.value]
                     if q_gate in ['bloch']:
                         bloch[0] = q01 if q01 != bloch[0] else None
                     else:
                         command = get_command(q_gate,q01)
-                        eval(command[0])
+                        command[0](grid.qc,grid.qr)
+                        grid._evolve(command[2])
+                        self._program.append( command[0] )
                         self.program.append( command[1] )
                     if required_gates[q01][gate.value]>0:
                         required_gates[q01][gate.value] -= 1
+                        self._gate_list_cache = None
 
                     grid.update_grid(bloch=bloch[0],hidden=vi[0],qubit=vi[1],corr=vi[2],message=get_total_gate_list(),output=grid_view)
 
@@ -277,32 +323,34 @@ class run_game():
         q = QuantumRegister(2,'q')
         b = ClassicalRegister(2,'b')
         qc = QuantumCircuit(q,b)
-                
-        if '[' not in self.qubit_names['0']+self.qubit_names['0']:
-            exec(self.qubit_names['0']+' = q[0]')
-            exec(self.qubit_names['1']+' = q[1]')
-            
+
         if use_initializer:
-            for line in self.initializer:
-                eval(line)
+            for apply_gate in self._initializer:
+                apply_gate(qc,q)
 
-        for line in self.program:
-            eval(line)
+        for apply_gate in self._program:
+            apply_gate(qc,q)
 
         return qc
     
     def plot_spheres(self):
-        return plot_bloch_multivector(Statevector(self.get_circuit(use_initializer=True)),reverse_bits=True)
+        # the figure is only redrawn if gates have been applied since the last call
+        key = (tuple(self._initializer), tuple(self._program))
+        if self._bloch_cache is None or self._bloch_cache[0]!=key:
+            fig = plot_bloch_multivector(Statevector(self.get_circuit(use_initializer=True)),reverse_bits=True)
+            self._bloch_cache = (key, fig)
+        return self._bloch_cache[1]
 
 class pauli_grid():
     # Allows a quantum circuit to be created, modified and implemented, and visualizes the output in the style of 'Hello Quantum'.
 
-    def __init__(self,backend=Aer.get_backend('qasm_simulator'),shots=1024,mode='circle',y_boxes=False):
+    def __init__(self,backend=None,shots=1024,mode='circle',y_boxes=False):
         """
-        backend=Aer.get_backend('qasm_simulator')
-            Backend to be used by Qiskit to calculate expectation values (defaults to local simulator).
+        backend=None
+            Backend to be used by Qiskit to calculate expectation values. By default, no backend is used, and they are instead calculated exactly from the statevector.
         shots=1024
-            Number of shots used to to calculate expectation values.
+            Number of shots used to to calculate expectation values (only used if a backend is given).
+            If numba is installed, it is imported and used to process the results once a backend is used, so the first refresh with a backend also includes the time taken to compile it.
         mode='circle'
             Either the standard 'Hello Quantum' visualization can be used (with mode='circle') or the alternative line based one (mode='line').
         y_boxes=True
@@ -325,14 +373,75 @@ class pauli_grid():
                         'XZ':( 1, 4),'ZZ':( 0, 3),
                         'ZX':(-1, 4),'XX':( 0, 5)}
 
+        # matrices for the observables in the grid, used to calculate expectation values directly from the statevector
+        # (the first character of each Pauli acts on qubit 0, which is the least significant in Qiskit's ordering)
+        single = {'I':np.eye(2), 'X':np.array([[0,1],[1,0]]), 'Y':np.array([[0,-1j],[1j,0]]), 'Z':np.diag([1,-1])}
+        self._paulis = {pauli: np.kron(single[pauli[1]],single[pauli[0]]) for pauli in self.box}
+
+        # matrices for the gates that run_game can apply, keyed by the gate and then the qubits (control first), so that the state can be updated without simulating self.qc
+        on = lambda j, U: np.kron(np.eye(2),U) if j==0 else np.kron(U,np.eye(2))
+        c, s = np.cos(np.pi/8), np.sin(np.pi/8)
+        single_gates = {'x':single['X'], 'y':single['Y'], 'z':single['Z'], 'h':np.array([[1,1],[1,-1]])/np.sqrt(2),
+                        'ry(pi/4)':np.array([[c,-s],[s,c]]), 'ry(-pi/4)':np.array([[c,s],[-s,c]]),
+                        'rx(pi/4)':np.array([[c,-1j*s],[-1j*s,c]]), 'rx(-pi/4)':np.array([[c,1j*s],[1j*s,c]])}
+        self._gate_mats = {}
+        for j in range(2):
+            k = 1-j
+            for gate, U in single_gates.items():
+                self._gate_mats[f'{gate}{j}'] = on(j,U).astype(np.complex128)
+            self._gate_mats[f'cx{k}{j}'] = (on(k,np.diag([1,0])) + on(k,np.diag([0,1])) @ on(j,single['X'])).astype(np.complex128)
+            self._gate_mats[f'cz{k}{j}'] = np.diag([1,1,1,-1]).astype(np.complex128)
+            self._gate_mats[f'swap{k}{j}'] = np.eye(4)[[0,2,1,3]].astype(np.complex128)
+
+        # the state of self.qc, and the gates it accounts for (all of them, as long as they were added with self._evolve)
+        self._psi = np.array([1,0,0,0], dtype=np.complex128)
+        self._psi_key = ()
+
         self.rho = {pauli: 0.0 for pauli in self.box}
         for pauli in ['ZI','IZ','ZZ']:
             self.rho[pauli] = 1.0
 
+        # expectation values of recently seen circuits, keyed by their gate sequence and how they were calculated
+        self._rho_cache = OrderedDict()
+        self._rho_cache_size = 32
+
         self.qr = QuantumRegister(2)
         self.cr = ClassicalRegister(2)
         self.qc = QuantumCircuit(self.qr, self.cr)
 
+        # measurement bases used when sampling, and the value (+1 or -1) each observable takes for each outcome in each basis
+        # outcomes are indexed by the integer value of the bit string, and single qubit observables are averaged over all bases in which they are measured
+        if self.y_boxes:
+            self._bases = ['ZZ','ZX','XZ','XX','YY','YX','YZ','XY','ZY']
+        else:
+            self._bases = ['ZZ','ZX','XZ','XX']
+        signs = 1 - 2*((np.arange(4)[:,None] >> np.arange(2)) & 1)
+        self._parity = np.zeros((len(self.box),len(self._bases),4))
+        for m, pauli in enumerate(self.box):
+            for b, basis in enumerate(self._bases):
+                if 'I' not in pauli:
+                    if pauli==basis:
+                        self._parity[m,b] = signs[:,0]*signs[:,1]
+                else:
+                    j = 1 - pauli.index('I')
+                    if pauli[j]==basis[j]:
+                        self._parity[m,b] = signs[:,j]/(2+self.y_boxes)
+
+        # the rotations and measurements appended to self.qc when sampling in each basis
+        # (these are built even without a backend, since self.backend can be set later)
+        self._basis_measurements = {}
+        for basis in self._bases:
+            measure_qc = QuantumCircuit(self.qr, self.cr)
+            for j in range(2):
+                if basis[j]=='X':
+                    measure_qc.h(self.qr[j])
+                elif basis[j]=='Y':
+                    measure_qc.sdg(self.qr[j])
+                    measure_qc.h(self.qr[j])
+            measure_qc.barrier(self.qr)
+            measure_qc.measure(self.qr,self.cr)
+            self._basis_measurements[basis] = measure_qc
+
         self.mode = mode
 
         figsize = (5, 5) if self.mode!='y' else (6, 6)
@@ -351,69 +460,101 @@ class pauli_grid():
                 )
             )
 
+        self.L = 0.98*np.sqrt(2) # box height and width
+        self.length = 0.75*self.L # line length
+        self.width = 0.12*self.L # line width
+        self.r = 0.6 # circle radius
+
+        # the circles and the three parts of each line are drawn once here, and update_grid then moves, resizes and hides them as needed
+        self.circles = {}
+        for pauli in self.box:
+            color = circle_color[1] if 'Y' in pauli else circle_color[0]
+            self.circles[pauli] = self.ax.add_patch( Circle(self.box[pauli], self.r, color=color, visible=False, zorder=2) )
+        self.bars = {}
+        if self.mode=='line':
+            for pauli in self.box:
+                for line, angle in [('Z',0),('X',0),('ZXY',-45)]:
+                    self.bars[pauli,line] = [
+                        self.ax.add_patch( Rectangle( (0,0), 0, 0, angle=angle, color=color, visible=False, zorder=3) )
+                        for color in [line_color[0],line_color[2],line_color[1]]
+                    ]
+
         self.initial = True
 
     def get_rho(self):
         # Runs the circuit specified by self.qc and determines the expectation values for 'ZI', 'IZ', 'ZZ', 'XI', 'IX', 'XX', 'ZX' and 'XZ' (and the ones with Ys too if needed).
 
-        if self.y_boxes:
-            corr = ['ZZ','ZX','XZ','XX','YY','YX','YZ','XY','ZY']
-            ps = ['X','Y','Z']
+        # refreshing the grid for a circuit that has already been run just reuses the previous results
+        gates = self._gate_key(self.qc.data)
+        key = (self.backend, self.shots, gates)
+        if key in self._rho_cache:
+            self._rho_cache.move_to_end(key)
+            self.rho = dict(self._rho_cache[key])
+            return
+
+        if self.backend is None:
+            # no sampling needed: take <psi|P|psi> for each observable
+            # (self.qc is only simulated if gates were added to it without using self._evolve)
+            if self._psi_key!=gates:
+                self._psi = Statevector.from_instruction(self.qc).data
+                self._psi_key = gates
+            psi = self._psi
+            self.rho = {pauli: float(np.real(psi.conj() @ P @ psi)) for pauli, P in self._paulis.items()}
         else:
-            corr = ['ZZ','ZX','XZ','XX']
-            ps = ['X','Z']
-
-
-        self.rho = {}
-
-        results = {}
-        for basis in corr:
-            temp_qc = copy.deepcopy(self.qc)
-            for j in range(2):
-                if basis[j]=='X':
-                    temp_qc.h(self.qr[j])
-                elif basis[j]=='Y':
-                    temp_qc.sdg(self.qr[j])
-                    temp_qc.h(self.qr[j])
-
-            if self.backend is None:
-                ket = Statevector([1,0,0,0])
-                ket = ket.from_instruction(temp_qc)
-                results[basis] = ket.probabilities_dict()
-            else:     
-                temp_qc.barrier(self.qr)
-                temp_qc.measure(self.qr,self.cr)
-                job = execute(temp_qc, backend=self.backend, shots=self.shots)
-                results[basis] = job.result().get_counts()
-                for string in results[basis]:
-                    results[basis][string] = results[basis][string]/self.shots
-
-        prob = {}
-        # prob of expectation value -1 for single qubit observables
-        for j in range(2):
-
-            for p in ps:
-                pauli = {pp: (j==1)*pp + p + (j==0)*pp for pp in ['I']+ps}
-                prob[pauli['I']] = 0
-                for ppp in ps:
-                    basis = pauli[ppp]
-                    for string in results[basis]:
-                        if string[(j+1)%2]=='1':
-                            prob[pauli['I']] += results[basis][string]/(2+self.y_boxes)
-
-        # prob of expectation value -1 for two qubit observables
-        for basis in corr:
-            prob[basis] = 0
-            for string in results[basis]:
-                if string[0]!=string[1]:
-                    prob[basis] += results[basis][string]
-
-        for pauli in prob:
-            self.rho[pauli] = 1-2*prob[pauli]
-             
-            
-            
-        
+            self.rho = self._sample_rho()
+
+        self._rho_cache[key] = dict(self.rho)
+        if len(self._rho_cache) > self._rho_cache_size:
+            self._rho_cache.popitem(last=False)
+
+    def _gate_key(self,gates):
+        # Describes a sequence of gates by their names, parameters and qubits, to check which circuit stored results belong to.
+
+        def param_key(param):
+            # Arrays (such as the matrix of a unitary gate) and other unhashable parameters are described by their contents.
+            if isinstance(param, np.ndarray):
+                return (param.shape, param.tobytes())
+            try:
+                hash(param)
+            except TypeError:
+                return repr(param)
+            return param
+
+        return tuple(
+            (gate.operation.name, tuple(param_key(param) for param in gate.operation.params), tuple(self.qc.find_bit(q).index for q in gate.qubits))
+            for gate in gates
+        )
+
+    def _evolve(self,gate):
+        # Updates the state for a gate that has just been added to self.qc, given by its key in self._gate_mats.
+        # If the state is already out of sync with self.qc, it is left for get_rho to recalculate.
+
+        if len(self._psi_key)==len(self.qc.data)-1:
+            self._psi = self._gate_mats[gate] @ self._psi
+            self._psi_key += self._gate_key(self.qc.data[-1:])
+
+    def _sample_rho(self):
+        # Estimates the expectation values by running the circuit on self.backend, once for each measurement basis.
+
+        # the measurements for each basis are added to self.qc only until it has been transpiled, so the circuit is never copied
+        num_gates = len(self.qc.data)
+        circuits = []
+        for basis in self._bases:
+            self.qc.compose(self._basis_measurements[basis], inplace=True)
+            try:
+                circuits.append(transpile(self.qc, self.backend))
+            finally:
+                del self.qc.data[num_gates:]
+
+        # all bases are submitted as a single job
+        job = self.backend.run(circuits, shots=self.shots)
+        counts = np.zeros((len(self._bases),4), dtype=np.int64)
+        for b, basis_counts in enumerate(job.result().get_counts()):
+            for string in basis_counts:
+                counts[b,int(string,2)] = basis_counts[string]
+
+        values = _get_reduce_counts()(counts, self._parity, self.shots)
+        return {pauli: float(value) for pauli, value in zip(self.box, values)}
 
     def update_grid(self,rho=None,labels=False,bloch=None,hidden=[],qubit=True,corr=True,message="",output=None):
         """
@@ -451,6 +592,14 @@ class pauli_grid():
             unhidden = unhidden and (pauli in self.rho)
             return unhidden
 
+        def set_bar(bar,xy,bar_width,bar_height):
+            # Move and resize one of the rectangles that make up a line, and make sure it is shown.
+
+            bar.set_xy(xy)
+            bar.set_width(bar_width)
+            bar.set_height(bar_height)
+            bar.set_visible(True)
+
         def add_line(line,pauli_pos,pauli):
             """
             For mode='line', add in the line.
@@ -462,8 +611,9 @@ class pauli_grid():
 
             delta = 0.07
 
-            unhidden = see_if_unhidden(pauli)
+            unhidden = unhidden_map[pauli]
             p = (1-self.rho[pauli])/2 # prob of 1 output
+            bars = self.bars[pauli_pos,line]
             # in the following, white lines goes from a to b, and black from b to c
             if unhidden:
                 if line=='X':
@@ -472,10 +622,10 @@ class pauli_grid():
                     c = ( self.box[pauli_pos][0]+length/2, self.box[pauli_pos][1]-width/2 )
                     b = ( p*a[0] + (1-p)*c[0] , p*a[1] + (1-p)*c[1] )
 
-                    self.ax.add_patch( Rectangle( a, length*(1-p), width, angle=0, color=line_color[0]) )
-                    self.ax.add_patch( Rectangle( b, length*p, width, angle=0, color=line_color[2]) )
+                    set_bar( bars[0], a, length*(1-p), width )
+                    set_bar( bars[1], b, length*p, width )
                     if length*p>delta:
-                        self.ax.add_patch( Rectangle( (b[0]+delta/2,b[1]+delta*0.6), length*p-delta, width-delta, angle=0, color=line_color[1]) )
+                        set_bar( bars[2], (b[0]+delta/2,b[1]+delta*0.6), length*p-delta, width-delta )
 
                 elif line=='Z':
 
@@ -483,10 +633,10 @@ class pauli_grid():
                     c = ( self.box[pauli_pos][0]-width/2, self.box[pauli_pos][1]+length/2 )
                     b = ( p*a[0] + (1-p)*c[0] , p*a[1] + (1-p)*c[1] )
 
-                    self.ax.add_patch( Rectangle( a, width, length*(1-p), angle=0, color=line_color[0]) )
-                    self.ax.add_patch( Rectangle( b, width, length*p, angle=0, color=line_color[2]) )
+                    set_bar( bars[0], a, width, length*(1-p) )
+                    set_bar( bars[1], b, width, length*p )
                     if length*p>delta:
-                        self.ax.add_patch( Rectangle( (b[0]+delta/2,b[1]+delta/2), width-delta, length*p-delta, angle=0, color=line_color[1]) )
+                        set_bar( bars[2], (b[0]+delta/2,b[1]+delta/2), width-delta, length*p-delta )
 
                 else:
 
@@ -495,23 +645,23 @@ class pauli_grid():
                     c = ( self.box[pauli_pos][0]+length/(2*np.sqrt(2)), self.box[pauli_pos][1]+length/(2*np.sqrt(2)) )
                     b = ( p*a[0] + (1-p)*c[0] , p*a[1] + (1-p)*c[1] )
 
-                    self.ax.add_patch( Rectangle( a, width, length*(1-p), angle=-45, color=line_color[0]) )
-                    self.ax.add_patch( Rectangle( b, width, length*p, angle=-45, color=line_color[2]) )
+                    set_bar( bars[0], a, width, length*(1-p) )
+                    set_bar( bars[1], b, width, length*p )
                     if length*p>delta:
-                        self.ax.add_patch( Rectangle( (b[0]+delta*np.sqrt(2)/2,b[1]+delta*0.1*np.sqrt(2)/2), width-delta, length*p-delta, angle=-45, color=line_color[1]) )
+                        set_bar( bars[2], (b[0]+delta*np.sqrt(2)/2,b[1]+delta*0.1*np.sqrt(2)/2), width-delta, length*p-delta )
 
             return p
 
-        L = 0.98*np.sqrt(2) # box height and width
-        length = 0.75*L # line length
-        width = 0.12*L # line width
-        r = 0.6 # circle radius
+        L, length, width = self.L, self.length, self.width
 
-        # set the state
+        # set the state (get_rho reuses its stored results while self.qc is unchanged, so refreshes that don't add a gate stay cheap)
         self.rho = rho
         if self.rho == {} or self.rho is None:
             self.get_rho()
 
+        # which circles are shown only depends on the arguments and rho, so work this out once
+        unhidden_map = {pauli: see_if_unhidden(pauli) for pauli in self.box}
+
         # draw boxes
         if self.initial:
             for pauli in self.box:
@@ -520,22 +670,19 @@ class pauli_grid():
 
         # draw circles
         for pauli in self.box:
-            unhidden = see_if_unhidden(pauli)
-            if unhidden:
-                if self.mode!='line':
-                    prob = (1-self.rho[pauli])/2
-                    color=(prob,prob,prob) 
-                    self.ax.add_patch( Circle(self.box[pauli], r, color=color) )
-                else:
-                    if 'Y' in pauli:
-                        self.ax.add_patch( Circle(self.box[pauli], r, color=circle_color[1]) )
-                    else:
-                        self.ax.add_patch( Circle(self.box[pauli], r, color=circle_color[0]) )
+            unhidden = unhidden_map[pauli]
+            if unhidden and self.mode!='line':
+                prob = (1-self.rho[pauli])/2
+                self.circles[pauli].set_color((prob,prob,prob))
+            self.circles[pauli].set_visible(unhidden)
 
-        # hide points
+        # hide points and lines
         for pauli in self.points:
             for point in self.points[pauli]:
                 point.radius = 0
+        for bars in self.bars.values():
+            for bar in bars:
+                bar.set_visible(False)
 
         # update bars if required
         if self.mode=='line':
@@ -546,7 +693,7 @@ class pauli_grid():
                     prob_z = add_line('Z',pz,pz)
                     prob_x = add_line('X',pz,px)
                     for j,point in enumerate(self.points[pz]):
-                        if see_if_unhidden(pz):
+                        if unhidden_map[pz]:
                             point.center = (self.box[pz][0]-(prob_x-0.5)*length, self.box[pz][1]-(prob_z-0.5)*length)
                             point.radius = (j==0)*0.05 + (j==1)*0.04
                 px = 'I'*(bloch=='0') + 'X' + 'I'*(bloch=='1')
@@ -53,14 +53,14 @@ if __name__ == '__main__':
     for course in toc:
         check_course(course)
 
-    referenced_notebooks = []
+    referenced_notebooks = set()
     for course in toc:
-        referenced_notebooks.extend(
-            Path(f"notebooks/{section['url']}.ipynb")
+        referenced_notebooks.update(
+            (NOTEBOOKS_PATH / f"{section['url'].strip('/')}.ipynb").resolve()
             for section in course['sections']
         )
-    for notebook in Path('notebooks').rglob('*.ipynb'):
-        if notebook not in referenced_notebooks:
+    for notebook in NOTEBOOKS_PATH.rglob('*.ipynb'):
+        if notebook.resolve() not in referenced_notebooks:
             if notebook.stem.startswith('_'):
                 continue
             if notebook.stem.endswith('-checkpoint'):